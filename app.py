@@ -1,66 +1,202 @@
 import os
+import atexit
 import logging
+import logging.handlers
 from typing import Any, Dict
 import uuid
 import queue
+import re
+import sqlite3
+from collections import OrderedDict, deque
+import itertools
+import copy
+from dataclasses import dataclass
 import datetime
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from flask import Flask, jsonify, request, Response, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
 from openai import OpenAI
-from dotenv import load_dotenv
-import requests
-from twilio.twiml.messaging_response import MessagingResponse
+import httpx
 import threading
 import time
 import hmac
 import hashlib
 import json
+import orjson
 from pathlib import Path
 
 
 
-# Load environment variables from .env if present
-load_dotenv()
+# Load environment variables from .env if present (import python-dotenv only when needed)
+_ENV_FILE = Path(__file__).resolve().with_name(".env")
+if _ENV_FILE.exists():
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
 
 # Project root (repo root) to serve frontend assets
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (keys keep insertion order)."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
 # Serve static files from project root at the web root path
 app = Flask(
     __name__,
     static_folder=str(PROJECT_ROOT),
     static_url_path="",
 )
-app.json.sort_keys = False
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for frontend requests
-
-# Basic logging
-logging.basicConfig(level=logging.INFO)
+# Compress JSON/static responses; text/event-stream is left out so SSE frames flush immediately
+app.config["COMPRESS_MIMETYPES"] = ["application/json", "text/html", "text/css", "application/javascript"]
+app.config["COMPRESS_MIN_SIZE"] = 1024
+Compress(app)
+
+# Basic logging; records are handed to a background listener so slow stdout sinks
+# (journald, Docker log drivers) never stall request handlers
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+_log_queue_handler = logging.handlers.QueueHandler(_log_queue)
+# prepare() bakes the formatted text into record.msg; keep it to the bare message so the
+# listener's handler applies BASIC_FORMAT exactly once
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_log_queue_handler])
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger("elevenlabs-api")
 
-# Config
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
-ELEVENLABS_AGENT_ID = os.getenv("ELEVENLABS_AGENT_ID", "")
-ELEVENLABS_AGENT_PHONE_NUMBER_ID = os.getenv("ELEVENLABS_AGENT_PHONE_NUMBER_ID", "")
-ELEVENLABS_FROM_NUMBER = os.getenv("ELEVENLABS_FROM_NUMBER", "")
-PORT = int(os.getenv("PORT", "5001"))
-TRANSCRIPT_POLL_INTERVAL_SECONDS = int(os.getenv("TRANSCRIPT_POLL_INTERVAL_SECONDS", "5"))
-TRANSCRIPT_POLL_TIMEOUT_SECONDS = int(os.getenv("TRANSCRIPT_POLL_TIMEOUT_SECONDS", "900"))
-ELEVENLABS_WEBHOOK_SECRET = os.getenv("ELEVENLABS_WEBHOOK_SECRET", "")
+# Config (read from the environment once at import)
+@dataclass(frozen=True)
+class Config:
+    api_key: str
+    agent_id: str
+    agent_phone_number_id: str
+    from_number: str
+    webhook_secret: str
+    # Which "t=...,v0=..." canonicalization to check: raw|dot|colon|concat, or "" to try all
+    webhook_canon: str
+    port: int
+    max_webhook_bytes: int
+    # (connect, read) timeouts for ElevenLabs; fail fast when the API is unreachable
+    connect_timeout_seconds: float
+    read_timeout_seconds: float
+
+
+CFG = Config(
+    api_key=os.getenv("ELEVENLABS_API_KEY", ""),
+    agent_id=os.getenv("ELEVENLABS_AGENT_ID", ""),
+    agent_phone_number_id=os.getenv("ELEVENLABS_AGENT_PHONE_NUMBER_ID", ""),
+    from_number=os.getenv("ELEVENLABS_FROM_NUMBER", ""),
+    webhook_secret=os.getenv("ELEVENLABS_WEBHOOK_SECRET", ""),
+    webhook_canon=os.getenv("ELEVENLABS_WEBHOOK_CANON", "dot"),
+    port=int(os.getenv("PORT", "5001")),
+    max_webhook_bytes=int(os.getenv("MAX_WEBHOOK_BYTES", str(5 * 1024 * 1024))),
+    connect_timeout_seconds=float(os.getenv("ELEVENLABS_CONNECT_TIMEOUT_SECONDS", "5")),
+    read_timeout_seconds=float(os.getenv("ELEVENLABS_READ_TIMEOUT_SECONDS", "30")),
+)
+# The API key is baked into the shared client below, so misconfiguration is fatal at startup
+if not CFG.api_key or not CFG.agent_id:
+    raise SystemExit("Missing ELEVENLABS_API_KEY or ELEVENLABS_AGENT_ID.")
+if CFG.webhook_canon not in ("", "raw", "dot", "colon", "concat"):
+    raise SystemExit("ELEVENLABS_WEBHOOK_CANON must be one of raw, dot, colon, concat (or empty to try all).")
+
+# Encoded once; the secret is constant for the process lifetime
+_WH_KEY = CFG.webhook_secret.encode() if CFG.webhook_secret else None
+ELEVENLABS_TIMEOUT = httpx.Timeout(CFG.read_timeout_seconds, connect=CFG.connect_timeout_seconds)
 
 ELEVEN_OUTBOUND_URL = "https://api.elevenlabs.io/v1/convai/twilio/outbound-call"
-ELEVEN_CONVO_URL_TMPL = "https://api.elevenlabs.io/v1/convai/conversations/{conversation_id}"
+ELEVEN_CONVO_URL_BASE = "https://api.elevenlabs.io/v1/convai/conversations/"
+
+# Outbound-call input limits, checked locally before spending an upstream round-trip
+_E164 = re.compile(r"^\+[1-9]\d{7,14}$")
+_PHONE_SEPARATORS = re.compile(r"[\s().-]")
+MAX_PROMPT_CHARS = 4096
+
+# Static outbound-call fields: the agent plus whichever sender is configured (phone number id preferred)
+BASE_PAYLOAD: Dict[str, str] = {"agent_id": CFG.agent_id}
+if CFG.agent_phone_number_id:
+    BASE_PAYLOAD["agent_phone_number_id"] = CFG.agent_phone_number_id
+elif CFG.from_number:
+    BASE_PAYLOAD["from_number"] = CFG.from_number
+
+# Static envelope for outbound-call client data; dynamic_variables are filled per call
+_CLIENT_DATA_TEMPLATE = {"type": "conversation_initiation_client_data"}
+
+
+@functools.lru_cache(maxsize=1024)
+def _convo_url(conversation_id: str) -> str:
+    # Cached because pollers request the same conversation ids repeatedly
+    return f"{ELEVEN_CONVO_URL_BASE}{conversation_id}"
+
+
+# Shared HTTP/2 client so ElevenLabs calls multiplex over pooled keep-alive connections
+CLIENT = httpx.Client(
+    headers={
+        "xi-api-key": CFG.api_key,
+        "Content-Type": "application/json",
+    },
+    # HTTP/2, pool limits and connect retries must be set on the transport when one is passed
+    transport=httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        retries=2,
+    ),
+    timeout=ELEVENLABS_TIMEOUT,
+    follow_redirects=True,
+)
+atexit.register(CLIENT.close)
 
 
-# Simple JSON-file based call store
+# SQLite call store; finalized call data files from /api/finalize-call still live in calls/
 CALLS_DIR = "calls"
+CALLS_DB_FILE = "calls.db"
+LIST_CALLS_DEFAULT_LIMIT = 50
+LIST_CALLS_MAX_LIMIT = 500
+# Legacy JSON store, imported into SQLite on first start
 CALLS_INDEX_FILE = os.path.join(CALLS_DIR, "index.json")
 
 os.makedirs(CALLS_DIR, exist_ok=True)
+CALLS_ROOT = Path(CALLS_DIR).resolve()
+
+# Files on disk are compact by default; set DEBUG_PRETTY_JSON=1 to indent them for reading
+DEBUG_PRETTY_JSON = bool(os.getenv("DEBUG_PRETTY_JSON"))
+
+def _dump_json_file(obj: Any) -> bytes:
+    if DEBUG_PRETTY_JSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return orjson.dumps(obj)
+
+_UTC = datetime.timezone.utc
 
 def _utc_now_iso() -> str:
-    return datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
+    return datetime.datetime.now(_UTC).isoformat()
+
+_TRANSCRIPT_TEXT_KEYS = ("text", "content", "utterance")
+
+def _transcript_line(item: Any) -> str:
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        for k in _TRANSCRIPT_TEXT_KEYS:
+            text = item.get(k)
+            if isinstance(text, str):
+                return text
+        return orjson.dumps(item).decode()
+    return str(item)
 
 def _normalize_transcript(value: Any) -> str | None:
     """Convert various transcript shapes to a readable string.
@@ -78,91 +214,382 @@ def _normalize_transcript(value: Any) -> str | None:
             if isinstance(value.get(k), str):
                 return value.get(k)
         try:
-            return json.dumps(value)
+            return orjson.dumps(value).decode()
         except Exception:
             return str(value)
     if isinstance(value, list):
-        lines: list[str] = []
-        for item in value:
-            if isinstance(item, str):
-                lines.append(item)
-            elif isinstance(item, dict):
-                text = item.get("text") or item.get("content") or item.get("utterance")
-                if isinstance(text, str):
-                    lines.append(text)
-                else:
-                    try:
-                        lines.append(json.dumps(item))
-                    except Exception:
-                        lines.append(str(item))
-            else:
-                lines.append(str(item))
-        return "\n".join(lines)
+        # Common case: already a list of lines (join raises TypeError on the first non-str item)
+        if value and isinstance(value[0], str):
+            try:
+                return "\n".join(value)
+            except TypeError:
+                pass
+        return "\n".join([_transcript_line(item) for item in value])
     try:
         return str(value)
     except Exception:
         return None
 
-def _read_index() -> Dict[str, Any]:
-    if not os.path.exists(CALLS_INDEX_FILE):
-        return {"calls": []}
-    try:
-        with open(CALLS_INDEX_FILE, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {"calls": []}
 
-def _write_index(index: Dict[str, Any]) -> None:
-    tmp = CALLS_INDEX_FILE + ".tmp"
-    with open(tmp, "w") as f:
-        json.dump(index, f, indent=2)
-    os.replace(tmp, CALLS_INDEX_FILE)
+_DB = sqlite3.connect(CALLS_DB_FILE, check_same_thread=False, isolation_level=None)
+_DB.execute("PRAGMA journal_mode=WAL")
+_DB.execute("PRAGMA synchronous=NORMAL")
+_DB.execute("""
+    CREATE TABLE IF NOT EXISTS calls (
+        id TEXT PRIMARY KEY,
+        conversation_id TEXT UNIQUE,
+        status TEXT,
+        receiver_name TEXT,
+        to_number TEXT,
+        json_blob TEXT NOT NULL,
+        created_at TEXT,
+        finished_at TEXT
+    )
+""")
+_DB.execute("CREATE INDEX IF NOT EXISTS calls_created_at ON calls (created_at)")
+# One connection shared by all request threads
+_DB_LOCK = threading.Lock()
+atexit.register(_DB.close)
 
 def _save_call_record(call_id: str, record: Dict[str, Any]) -> None:
-    path = os.path.join(CALLS_DIR, f"{call_id}.json")
-    tmp = path + ".tmp"
-    with open(tmp, "w") as f:
-        json.dump(record, f, indent=2)
-    os.replace(tmp, path)
+    with _DB_LOCK:
+        _DB.execute(
+            """
+            INSERT INTO calls (id, conversation_id, status, receiver_name, to_number, json_blob, created_at, finished_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                conversation_id = excluded.conversation_id,
+                status = excluded.status,
+                receiver_name = excluded.receiver_name,
+                to_number = excluded.to_number,
+                json_blob = excluded.json_blob,
+                created_at = excluded.created_at,
+                finished_at = excluded.finished_at
+            """,
+            (
+                call_id,
+                record.get("conversation_id"),
+                record.get("status"),
+                record.get("receiver_name"),
+                record.get("to_number"),
+                orjson.dumps(record).decode(),
+                record.get("created_at"),
+                record.get("finished_at"),
+            ),
+        )
 
 def _read_call_record(call_id: str) -> Dict[str, Any] | None:
-    path = os.path.join(CALLS_DIR, f"{call_id}.json")
-    if not os.path.exists(path):
+    with _DB_LOCK:
+        row = _DB.execute("SELECT json_blob FROM calls WHERE id = ?", (call_id,)).fetchone()
+    if row is None:
         return None
     try:
-        with open(path, "r") as f:
-            return json.load(f)
+        return orjson.loads(row[0])
     except Exception:
         return None
 
+def _find_call_id(conversation_id: str) -> str | None:
+    with _DB_LOCK:
+        row = _DB.execute("SELECT id FROM calls WHERE conversation_id = ?", (conversation_id,)).fetchone()
+    return row[0] if row else None
+
+def _list_calls(limit: int, offset: int) -> tuple[list[Dict[str, Any]], int]:
+    """Return one page of call summaries (newest first) and the total number of calls."""
+    with _DB_LOCK:
+        rows = _DB.execute(
+            "SELECT id, status, receiver_name, to_number, created_at, conversation_id FROM calls "
+            "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+        total = _DB.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+    calls = [
+        {"id": r[0], "status": r[1], "receiver_name": r[2], "to_number": r[3], "created_at": r[4], "conversation_id": r[5]}
+        for r in rows
+    ]
+    return calls, total
+
+def _import_json_store() -> None:
+    """Copy records from the legacy calls/index.json store into an empty database."""
+    with _DB_LOCK:
+        if _DB.execute("SELECT 1 FROM calls LIMIT 1").fetchone():
+            return
+    try:
+        with open(CALLS_INDEX_FILE, "r") as f:
+            items = json.load(f).get("calls", [])
+    except FileNotFoundError:
+        return
+    except Exception:
+        logger.exception("Failed to read legacy %s; skipping import", CALLS_INDEX_FILE)
+        return
+    for item in items:
+        call_id = item.get("id")
+        try:
+            with open(os.path.join(CALLS_DIR, f"{call_id}.json"), "r") as f:
+                record = json.load(f)
+            _save_call_record(call_id, record)
+        except Exception:
+            logger.warning("Skipping legacy call record %s", call_id)
+
+_import_json_store()
+
+
+# Parsed finalized call files keyed by resolved path, reused while st_mtime_ns is unchanged
+_FINALIZED_CACHE_MAX = 256
+_FINALIZED_CACHE: "OrderedDict[str, tuple[int, Dict[str, Any]]]" = OrderedDict()
+_FINALIZED_CACHE_LOCK = threading.Lock()
+
+def _load_finalized_call(path: Path) -> Dict[str, Any]:
+    """Read a /api/finalize-call JSON file; the returned dict is shared and must not be mutated."""
+    key = str(path)
+    mtime_ns = path.stat().st_mtime_ns
+    with _FINALIZED_CACHE_LOCK:
+        cached = _FINALIZED_CACHE.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            _FINALIZED_CACHE.move_to_end(key)
+            return cached[1]
+    loaded = orjson.loads(path.read_bytes())
+    with _FINALIZED_CACHE_LOCK:
+        _FINALIZED_CACHE[key] = (mtime_ns, loaded)
+        _FINALIZED_CACHE.move_to_end(key)
+        while len(_FINALIZED_CACHE) > _FINALIZED_CACHE_MAX:
+            _FINALIZED_CACHE.popitem(last=False)
+    return loaded
+
+
+def _parse_upstream_body(resp: httpx.Response) -> Any:
+    """Decode an ElevenLabs response: {} for empty bodies, JSON via orjson, else {"text": ...}."""
+    if resp.headers.get("content-length") == "0":
+        return {}
+    if "application/json" in resp.headers.get("content-type", ""):
+        try:
+            return orjson.loads(resp.content)
+        except orjson.JSONDecodeError:
+            pass
+    return {"text": resp.text}
+
+
+# Upstream validators for conversation fetches: conversation_id -> (etag, last_modified, body)
+_CONVO_CACHE_MAX = 512
+_CONVO_CACHE: "OrderedDict[str, tuple[str | None, str | None, Dict[str, Any]]]" = OrderedDict()
+_CONVO_CACHE_LOCK = threading.Lock()
+
+def _convo_cache_get(conversation_id: str) -> tuple[str | None, str | None, Dict[str, Any]] | None:
+    with _CONVO_CACHE_LOCK:
+        entry = _CONVO_CACHE.get(conversation_id)
+        if entry is not None:
+            _CONVO_CACHE.move_to_end(conversation_id)
+        return entry
+
+def _convo_cache_put(conversation_id: str, etag: str | None, last_modified: str | None, body: Dict[str, Any]) -> None:
+    with _CONVO_CACHE_LOCK:
+        _CONVO_CACHE[conversation_id] = (etag, last_modified, body)
+        _CONVO_CACHE.move_to_end(conversation_id)
+        while len(_CONVO_CACHE) > _CONVO_CACHE_MAX:
+            _CONVO_CACHE.popitem(last=False)
+
+
+# Transport retries only cover connection errors; GETs are idempotent, so also retry gateway errors
+_RETRY_STATUSES = frozenset((502, 503, 504))
+_RETRY_TOTAL = 2
+_RETRY_BACKOFF_SECONDS = 0.2
+
+def _get_with_retries(url: str, **kwargs: Any) -> httpx.Response:
+    for attempt in range(_RETRY_TOTAL + 1):
+        resp = CLIENT.get(url, **kwargs)
+        if resp.status_code not in _RETRY_STATUSES or attempt == _RETRY_TOTAL:
+            return resp
+        time.sleep(_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+    return resp
+
+def _fetch_conversation(conversation_id: str) -> tuple[int, Any]:
+    """GET a conversation from ElevenLabs, revalidating any cached copy. Returns (status, body)."""
+    cached = _convo_cache_get(conversation_id)
+    conditional_headers = {}
+    if cached:
+        cached_etag, cached_last_modified, _ = cached
+        if cached_etag:
+            conditional_headers["If-None-Match"] = cached_etag
+        if cached_last_modified:
+            conditional_headers["If-Modified-Since"] = cached_last_modified
+    resp = _get_with_retries(_convo_url(conversation_id), headers=conditional_headers)
+
+    if resp.status_code == 304 and cached:
+        return 200, cached[2]
+
+    data = _parse_upstream_body(resp)
+    if resp.is_error:
+        return resp.status_code, data
+
+    upstream_etag = resp.headers.get("ETag")
+    upstream_last_modified = resp.headers.get("Last-Modified")
+    if isinstance(data, dict) and (upstream_etag or upstream_last_modified):
+        _convo_cache_put(conversation_id, upstream_etag, upstream_last_modified, data)
+    return resp.status_code, data
+
+
+# Single-flight: concurrent requests for the same conversation share one upstream GET.
+# A finished result stays shareable for a short coalescing window, so a dashboard refreshing
+# several panels (or tabs) for one conversation in a burst still costs a single upstream call.
+_CONVO_COALESCE_SECONDS = 0.05
+# conversation_id -> (future, monotonic completion time or None while in flight)
+_CONVO_INFLIGHT: dict[str, tuple[Future, float | None]] = {}
+_CONVO_INFLIGHT_LOCK = threading.Lock()
+
+def _fetch_conversation_shared(conversation_id: str) -> tuple[int, Any]:
+    with _CONVO_INFLIGHT_LOCK:
+        entry = _CONVO_INFLIGHT.get(conversation_id)
+        if entry is not None and entry[1] is not None and time.monotonic() - entry[1] > _CONVO_COALESCE_SECONDS:
+            entry = None
+        leader = entry is None
+        if leader:
+            fut: Future = Future()
+            _CONVO_INFLIGHT[conversation_id] = (fut, None)
+        else:
+            fut = entry[0]
+    if not leader:
+        # The leader's GET is bounded by the client timeout, so no extra timeout here
+        return fut.result()
 
-# SSE subscription management
-_sse_clients: list[queue.Queue] = []
+    try:
+        result = _fetch_conversation(conversation_id)
+    except BaseException as e:
+        fut.set_exception(e)
+        # Failures are not reused; the next request retries upstream
+        with _CONVO_INFLIGHT_LOCK:
+            _CONVO_INFLIGHT.pop(conversation_id, None)
+        raise
+    fut.set_result(result)
+    with _CONVO_INFLIGHT_LOCK:
+        now = time.monotonic()
+        _CONVO_INFLIGHT[conversation_id] = (fut, now)
+        # Drop other finished entries whose window has passed
+        for cid in [cid for cid, (_, done_at) in _CONVO_INFLIGHT.items()
+                    if done_at is not None and now - done_at > _CONVO_COALESCE_SECONDS]:
+            del _CONVO_INFLIGHT[cid]
+    return result
+
+
+# SSE subscription management: each client is {"q": Queue, "misses": int}
+_SSE_QUEUE_SIZE = 100
+_SSE_MAX_MISSES = 3
+_SSE_REPLAY_SIZE = 256
+_sse_clients: list[Dict[str, Any]] = []
+# Recent (event_id, framed) pairs replayed to reconnecting clients via Last-Event-ID;
+# ids carry a per-process token so ids from before a restart replay the whole buffer
+_sse_replay: "deque[tuple[int, str]]" = deque(maxlen=_SSE_REPLAY_SIZE)
+_sse_boot_token = uuid.uuid4().hex[:8]
+_sse_event_ids = itertools.count(1)
+_sse_lock = threading.Lock()
+
+def _sse_frame(event: str, data: Dict[str, Any], event_id: str | None = None) -> str:
+    # Encoded and framed once, then shared by every subscriber queue
+    id_line = f"id: {event_id}\n" if event_id else ""
+    return f"{id_line}data: {orjson.dumps({'event': event, 'data': data}).decode()}\n\n"
+
+def _close_slow_subscriber(q: queue.Queue) -> None:
+    """Drop everything still queued and send a close sentinel; the stream then ends and unsubscribes.
+    Draining the whole queue (not just its head) keeps the client's Last-Event-ID at the last frame it
+    actually read, so the replay buffer resends every dropped frame on reconnect."""
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            break
+    try:
+        q.put_nowait(None)
+    except queue.Full:
+        pass
 
 def _broadcast(event: str, data: Dict[str, Any]) -> None:
-    payload = json.dumps({"event": event, "data": data})
-    for q in list(_sse_clients):
+    with _sse_lock:
+        seq = next(_sse_event_ids)
+        framed = _sse_frame(event, data, f"{_sse_boot_token}-{seq}")
+        _sse_replay.append((seq, framed))
+        for subscriber in list(_sse_clients):
+            try:
+                subscriber["q"].put_nowait(framed)
+                subscriber["misses"] = 0
+            except queue.Full:
+                subscriber["misses"] += 1
+                if subscriber["misses"] >= _SSE_MAX_MISSES:
+                    _sse_clients.remove(subscriber)
+                    _close_slow_subscriber(subscriber["q"])
+
+def _sse_replay_since(last_event_id: str | None) -> list[str]:
+    """Frames broadcast after last_event_id (caller holds _sse_lock)."""
+    if not last_event_id:
+        return []
+    token, _, seq = last_event_id.partition("-")
+    if token != _sse_boot_token or not seq.isdigit():
+        return [framed for _, framed in _sse_replay]
+    return [framed for n, framed in _sse_replay if n > int(seq)]
+
+
+# Per-conversation SSE channels so clients get pushed transcripts instead of polling
+_CONVO_EVENTS_MAX = 512
+_convo_subscribers: dict[str, list[queue.Queue]] = {}
+_convo_last_event: "OrderedDict[str, str]" = OrderedDict()
+_convo_subscribers_lock = threading.Lock()
+
+def _publish_conversation(conversation_id: str, data: Dict[str, Any]) -> None:
+    framed = _sse_frame("conversation_updated", data)
+    with _convo_subscribers_lock:
+        # Remember the latest event so late subscribers are not left waiting
+        _convo_last_event[conversation_id] = framed
+        _convo_last_event.move_to_end(conversation_id)
+        while len(_convo_last_event) > _CONVO_EVENTS_MAX:
+            _convo_last_event.popitem(last=False)
+        subscribers = list(_convo_subscribers.get(conversation_id, ()))
+    for q in subscribers:
         try:
-            q.put_nowait(payload)
-        except Exception:
-            pass
+            q.put_nowait(framed)
+        except queue.Full:
+            # Dropped frames are not replayed here, which is fine: each one is a full snapshot and
+            # the reconnecting client is sent the latest from _convo_last_event
+            _close_slow_subscriber(q)
+
+def _sse_stream(q: queue.Queue, on_close, backlog: list[str] | None = None) -> Response:
+    def gen():
+        try:
+            # Send an initial comment to open the stream
+            yield ": connected\n\n"
+            yield from backlog or ()
+            while True:
+                try:
+                    msg = q.get(timeout=25)
+                    if msg is None:
+                        # Dropped for falling behind; EventSource reconnects on its own
+                        return
+                    yield msg
+                except queue.Empty:
+                    # keep-alive
+                    yield ": keepalive\n\n"
+        finally:
+            on_close()
+
+    # Tell reverse proxies (nginx) not to buffer the stream
+    return Response(gen(), mimetype="text/event-stream", headers={"X-Accel-Buffering": "no"})
 
 
-def verify_webhook_signature(raw_body: bytes, signature: str | None) -> bool:
-    """Verify HMAC signature from ElevenLabs.
+def _webhook_signature_macs(signature: str | None) -> list[tuple[Any, bytes, str | None]] | None:
+    """Parse an ElevenLabs signature header into (hmac, provided_digest, canonicalization) triples
+    (canonicalization is None for plain digests).
     Accepts:
       - plain hex digest
       - "sha256=<hex>"
       - Stripe-like multi-part header: "t=TIMESTAMP,v0=HEX"
-    We try common payload canonicalizations seen in providers: raw, f"{t}.{raw}", f"{t}:{raw}", and f"{t}{raw}".
-    If ELEVENLABS_WEBHOOK_SECRET is not set, verification is bypassed.
+    For the Stripe-like header only the ELEVENLABS_WEBHOOK_CANON canonicalization is checked
+    (raw, dot=f"{t}.{raw}", colon=f"{t}:{raw}", concat=f"{t}{raw}"); when it is empty the
+    timestamped variants are all tried. Each HMAC is primed with its timestamp prefix and
+    only needs the body fed in afterwards.
+    Returns None when verification is bypassed (ELEVENLABS_WEBHOOK_SECRET not set) and an
+    empty list when the signature is missing or malformed.
     """
-    if not ELEVENLABS_WEBHOOK_SECRET:
-        return True
+    if not _WH_KEY:
+        return None
     if not signature:
-        return False
+        return []
 
-    secret = ELEVENLABS_WEBHOOK_SECRET.encode()
     sig_header = signature.strip()
 
     # Case A: Stripe-like list: "t=...,v0=..."
@@ -172,23 +599,19 @@ def verify_webhook_signature(raw_body: bytes, signature: str | None) -> bool:
             if "=" in piece:
                 k, v = piece.split("=", 1)
                 parts[k.strip()] = v.strip()
-        provided = (parts.get("v0") or "").lower()
+        provided_hex = parts.get("v0") or ""
         t = (parts.get("t") or "").strip()
-        if provided and t:
-            bodies = [
-                raw_body,
-                t.encode() + b"." + raw_body,
-                t.encode() + b":" + raw_body,
-                t.encode() + raw_body,
-            ]
-            for b in bodies:
-                try:
-                    cand = hmac.new(secret, b, hashlib.sha256).hexdigest().lower()
-                    if hmac.compare_digest(cand, provided):
-                        return True
-                except Exception:
-                    continue
-        return False
+        if not (provided_hex and t):
+            return []
+        try:
+            provided = bytes.fromhex(provided_hex)
+        except ValueError:
+            return []
+        tb = t.encode()
+        prefixes = {"raw": b"", "dot": tb + b".", "colon": tb + b":", "concat": tb}
+        # A provider that sends t= always mixes it in, so "raw" is only checked when pinned
+        canons = [CFG.webhook_canon] if CFG.webhook_canon else ["dot", "colon", "concat"]
+        return [(hmac.new(_WH_KEY, prefixes[c], hashlib.sha256), provided, c) for c in canons]
 
     # Case B: "sha256=<hex>" or plain hex
     sig = sig_header
@@ -200,10 +623,30 @@ def verify_webhook_signature(raw_body: bytes, signature: str | None) -> bool:
             pass
 
     try:
-        expected = hmac.new(secret, raw_body, hashlib.sha256).hexdigest().lower()
-        return hmac.compare_digest(expected, sig.lower())
-    except Exception:
-        return False
+        provided = bytes.fromhex(sig)
+    except ValueError:
+        return []
+    return [(hmac.new(_WH_KEY, b"", hashlib.sha256), provided, None)]
+
+
+_webhook_canon_logged = False
+
+def _webhook_signature_matches(macs: list[tuple[Any, bytes, str | None]]) -> bool:
+    global _webhook_canon_logged
+    for mac, provided, canon in macs:
+        if hmac.compare_digest(mac.digest(), provided):
+            if canon and not CFG.webhook_canon and not _webhook_canon_logged:
+                _webhook_canon_logged = True
+                logger.info("Webhook signature matched canonicalization %r; set ELEVENLABS_WEBHOOK_CANON=%s to pin it", canon, canon)
+            return True
+    return False
+
+
+def _webhook_too_large():
+    return jsonify({
+        "error": "payload_too_large",
+        "message": f"Webhook body exceeds {CFG.max_webhook_bytes} bytes."
+    }), 413
 
 
 @app.get("/")
@@ -221,21 +664,24 @@ def outbound_call():
       - or explicit fields (phone_number/call_summary or to_number/prompt)
     """
     try:
-        data = request.get_json(silent=True) or {}
+        try:
+            data = orjson.loads(request.get_data(cache=False) or b"{}") or {}
+        except orjson.JSONDecodeError:
+            data = {}
 
         # Allow server-side loading of finalized JSON to avoid client reading files
         call_data_file = data.get("call_data_file")
         loaded = None
         if call_data_file:
-            # Only allow files inside the calls directory
-            if not call_data_file.startswith("calls/"):
+            # Only allow files inside the calls directory (resolved, so "../" and symlinks can't escape)
+            call_data_path = Path(str(call_data_file)).resolve()
+            if not call_data_path.is_relative_to(CALLS_ROOT):
                 return jsonify({
                     "error": "invalid_file",
                     "message": "call_data_file must be inside the 'calls/' directory."
                 }), 400
             try:
-                with open(call_data_file, "r") as f:
-                    loaded = json.load(f)
+                loaded = _load_finalized_call(call_data_path)
             except FileNotFoundError:
                 return jsonify({
                     "error": "file_not_found",
@@ -261,46 +707,40 @@ def outbound_call():
                 "error": "missing_parameters",
                 "message": "Both 'to_number' and 'prompt' are required."
             }), 400
-        
-        # Validate configuration
-        if not ELEVENLABS_API_KEY or not ELEVENLABS_AGENT_ID:
+
+        to_number = _PHONE_SEPARATORS.sub("", str(to_number))
+        if not _E164.match(to_number):
+            return jsonify({
+                "error": "invalid_to_number",
+                "message": "'to_number' must be an E.164 phone number, e.g. +15551234567."
+            }), 400
+        if not isinstance(prompt, str):
             return jsonify({
-                "error": "server_not_configured",
-                "message": "Missing ELEVENLABS_API_KEY or ELEVENLABS_AGENT_ID."
-            }), 500
+                "error": "invalid_prompt",
+                "message": "'prompt' must be a string."
+            }), 400
+        if len(prompt) > MAX_PROMPT_CHARS:
+            return jsonify({
+                "error": "prompt_too_long",
+                "message": f"'prompt' must be at most {MAX_PROMPT_CHARS} characters."
+            }), 400
         
         # Build payload
+        client_data = copy.copy(_CLIENT_DATA_TEMPLATE)
+        client_data["dynamic_variables"] = {
+            "purpose": prompt,
+            "user_name": username,
+            "receiver_name": receiver_name,
+            # Used to correlate webhooks back to this record
+            "client_call_id": call_id
+        }
         payload = {
-            "agent_id": ELEVENLABS_AGENT_ID,
-            "agent_phone_number_id": ELEVENLABS_AGENT_PHONE_NUMBER_ID,
-            "from_number": ELEVENLABS_FROM_NUMBER,
+            **BASE_PAYLOAD,
             "to_number": to_number,
-            
             # Dynamic variables go here
-            "conversation_initiation_client_data": {
-                "type": "conversation_initiation_client_data",
-                "dynamic_variables": {
-                    "purpose": prompt,
-                    "user_name": username,
-                    "receiver_name": receiver_name,
-                    # Used to correlate webhooks back to this record
-                    "client_call_id": call_id
-                }
-            }
+            "conversation_initiation_client_data": client_data,
         }
-        
-        # Add phone number if configured
-        if ELEVENLABS_AGENT_PHONE_NUMBER_ID:
-            payload["agent_phone_number_id"] = ELEVENLABS_AGENT_PHONE_NUMBER_ID
-        elif ELEVENLABS_FROM_NUMBER:
-            payload["from_number"] = ELEVENLABS_FROM_NUMBER
-        
-        # Make API call
-        headers = {
-            "xi-api-key": ELEVENLABS_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
+
         # Create initial call record
         initial_record = {
             "id": call_id,
@@ -315,18 +755,7 @@ def outbound_call():
             "assistant_id": assistant_id
         }
 
-        # Persist to file store and index
-        index = _read_index()
-        index_calls = index.get("calls", [])
-        index_calls.insert(0, {
-            "id": call_id,
-            "status": "ongoing",
-            "receiver_name": receiver_name,
-            "to_number": to_number,
-            "created_at": initial_record["created_at"],
-        })
-        index["calls"] = index_calls
-        _write_index(index)
+        # Persist to the call store
         _save_call_record(call_id, initial_record)
         _broadcast("call_created", {
             "id": call_id,
@@ -336,16 +765,13 @@ def outbound_call():
             "created_at": initial_record["created_at"],
         })
 
-        logger.info(f"Initiating outbound call to {to_number} (call_id={call_id})")
-        resp = requests.post(ELEVEN_OUTBOUND_URL, headers=headers, json=payload, timeout=30)
+        logger.info("Initiating outbound call to %s (call_id=%s)", to_number, call_id)
+        resp = CLIENT.post(ELEVEN_OUTBOUND_URL, json=payload)
         
         # Parse response
-        try:
-            body = resp.json()
-        except Exception:
-            body = {"text": resp.text}
+        body = _parse_upstream_body(resp)
         
-        if resp.ok:
+        if not resp.is_error:
             # Update conversation_id if present
             conversation_id = None
             if isinstance(body, dict):
@@ -359,14 +785,14 @@ def outbound_call():
             # For webhook mode we don't poll here; webhook will deliver transcript
             return jsonify({"call_id": call_id, "elevenlabs": body}), resp.status_code
         
-        logger.warning(f"ElevenLabs call failed: {resp.status_code} - {body}")
+        logger.warning("ElevenLabs call failed: %s - %s", resp.status_code, body)
         return jsonify({
             "error": "elevenlabs_error",
             "status": resp.status_code,
             "details": body
         }), resp.status_code
         
-    except requests.Timeout:
+    except httpx.TimeoutException:
         return jsonify({
             "error": "timeout",
             "message": "Request to ElevenLabs timed out."
@@ -380,10 +806,43 @@ def outbound_call():
         }), 500
 
 
+# Summaries run on a small pool so webhooks return to ElevenLabs without waiting on OpenAI
+_SUMMARY_EXEC = ThreadPoolExecutor(max_workers=4, thread_name_prefix="summary")
+
+def _summarize_and_broadcast(call_id: str, transcript: str) -> None:
+    try:
+        summary_prompt = (
+            "You are an assistant. Summarize only the dialogue from the following phone call transcript. "
+            "Ignore timings, latency/metric lines, events, or system messages. "
+            "Provide 3-4 extremely concise bullet points capturing what happened in the conversation, and all important details."
+        )
+        messages = [
+            {"role": "system", "content": summary_prompt},
+            {"role": "user", "content": transcript},
+        ]
+        resp = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.3,
+            max_tokens=350,
+        )
+        summary_text = resp.choices[0].message.content
+        # Re-read so updates from webhooks that arrived meanwhile are not overwritten
+        record = _read_call_record(call_id) or {"id": call_id}
+        record["summary"] = summary_text
+        _save_call_record(call_id, record)
+        _broadcast("call_summary", {
+            "id": call_id,
+            "assistant_id": record.get("assistant_id"),
+            "summary": summary_text,
+        })
+    except Exception as e:
+        logger.exception("Failed to summarize transcript: %s", e)
+
+
 @app.route("/api/webhooks/elevenlabs", methods=["POST"])
 def elevenlabs_webhook():
     """Receive post-call webhook from ElevenLabs; log transcript and return 200."""
-    raw = request.data or b""
     # Accept multiple header casings/variants from providers
     signature = (
         request.headers.get("ElevenLabs-Signature")
@@ -393,19 +852,38 @@ def elevenlabs_webhook():
         or request.args.get("signature")
     )
 
-    if not verify_webhook_signature(raw, signature):
-        logger.warning("Invalid webhook signature. Headers present: %s", dict(request.headers))
+    if request.content_length is not None and request.content_length > CFG.max_webhook_bytes:
+        return _webhook_too_large()
+
+    # Hash the body while reading it so large transcripts are only touched once
+    macs = _webhook_signature_macs(signature)
+    chunks: list[bytes] = []
+    received = 0
+    for chunk in iter(lambda: request.stream.read(65536), b""):
+        received += len(chunk)
+        if received > CFG.max_webhook_bytes:
+            return _webhook_too_large()
+        for mac, _, _ in macs or ():
+            mac.update(chunk)
+        chunks.append(chunk)
+
+    if macs is not None and not _webhook_signature_matches(macs):
+        # Only materialize the headers dict when the record will actually be emitted
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("Invalid webhook signature. Headers present: %s", dict(request.headers))
         return jsonify({"error": "invalid_signature"}), 403
 
     try:
-        payload = request.get_json(force=True, silent=False) or {}
+        payload = orjson.loads(b"".join(chunks)) or {}
     except Exception:
         return jsonify({"error": "invalid_json"}), 400
+    # Release the raw body before the slower persistence/summarization work below
+    del chunks
 
     event_type = payload.get("type") or payload.get("event_type")
     data = payload.get("data") if isinstance(payload, dict) else None
 
-    logger.info(f"[webhook] Received ElevenLabs event: {event_type}")
+    logger.info("[webhook] Received ElevenLabs event: %s", event_type)
 
     if isinstance(data, dict):
         # Attempt to extract identifiers and payloads from multiple possible shapes
@@ -432,17 +910,16 @@ def elevenlabs_webhook():
         )
         status = data.get("status") or data.get("call_status") or conversation.get("status")
 
+        if conversation_id and (transcript is not None or recording_url is not None or status):
+            _publish_conversation(conversation_id, {
+                "conversation_id": conversation_id,
+                "status": status,
+                "transcript": transcript,
+                "recording_url": recording_url,
+            })
+
         # Try to locate record by conversation_id or dynamic client_call_id
-        call_id = None
-        if conversation_id:
-            # Search index for a record with this conversation id (fast path: read file names)
-            # Linear scan; acceptable for hackathon scale
-            idx = _read_index()
-            for item in idx.get("calls", []):
-                rec = _read_call_record(item.get("id"))
-                if rec and rec.get("conversation_id") == conversation_id:
-                    call_id = item.get("id")
-                    break
+        call_id = _find_call_id(conversation_id) if conversation_id else None
 
         # Fallback: sometimes webhook may include our dynamic variables
         dynamic = (
@@ -468,45 +945,9 @@ def elevenlabs_webhook():
                 record["finished_at"] = _utc_now_iso()
             _save_call_record(call_id, record)
 
-            # If transcript became available, optionally summarize and broadcast
+            # If transcript became available, summarize off the request thread and broadcast
             if record.get("transcript"):
-                try:
-                    summary_prompt = (
-                        "You are an assistant. Summarize only the dialogue from the following phone call transcript. "
-                        "Ignore timings, latency/metric lines, events, or system messages. "
-                        "Provide 3-4 extremely concise bullet points capturing what happened in the conversation, and all important details."
-                    )
-                    messages = [
-                        {"role": "system", "content": summary_prompt},
-                        {"role": "user", "content": record.get("transcript", "")},
-                    ]
-                    resp = client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=messages,
-                        temperature=0.3,
-                        max_tokens=350,
-                    )
-                    summary_text = resp.choices[0].message.content
-                    record["summary"] = summary_text
-                    _save_call_record(call_id, record)
-                    _broadcast("call_summary", {
-                        "id": call_id,
-                        "assistant_id": record.get("assistant_id"),
-                        "summary": summary_text,
-                    })
-                except Exception as e:
-                    logger.exception("Failed to summarize transcript: %s", e)
-
-            # Update index entry
-            index = _read_index()
-            for item in index.get("calls", []):
-                if item.get("id") == call_id:
-                    if status:
-                        item["status"] = record.get("status", status)
-                    if conversation_id:
-                        item["conversation_id"] = conversation_id
-                    break
-            _write_index(index)
+                _SUMMARY_EXEC.submit(_summarize_and_broadcast, call_id, record["transcript"])
 
             _broadcast("call_updated", {"id": call_id, "status": record.get("status"), "conversation_id": record.get("conversation_id")})
 
@@ -516,38 +957,34 @@ def elevenlabs_webhook():
 @app.route("/api/conversations/<conversation_id>", methods=["GET"])
 def get_conversation(conversation_id: str):
     try:
-        if not ELEVENLABS_API_KEY:
-            return (
-                jsonify({
-                    "error": "server_not_configured",
-                    "message": "Missing ELEVENLABS_API_KEY in environment.",
-                }),
-                500,
-            )
-
-        url = ELEVEN_CONVO_URL_TMPL.format(conversation_id=conversation_id)
-        headers = {"xi-api-key": ELEVENLABS_API_KEY}
-        resp = requests.get(url, headers=headers, timeout=30)
-
-        content_type = resp.headers.get("content-type", "")
-        try:
-            data = resp.json() if "application/json" in content_type else {"text": resp.text}
-        except Exception:
-            data = {"text": resp.text}
-
-        if not resp.ok:
-            return jsonify({"error": "elevenlabs_error", "status": resp.status_code, "body": data}), resp.status_code
+        upstream_status, data = _fetch_conversation_shared(conversation_id)
+        if upstream_status >= 400:
+            return jsonify({"error": "elevenlabs_error", "status": upstream_status, "body": data}), upstream_status
 
         transcript = _normalize_transcript(data.get("transcript")) if isinstance(data, dict) else None
         recording_url = data.get("recording_url") if isinstance(data, dict) else None
 
-        return jsonify({
+        result = {
             "conversation_id": conversation_id,
             "transcript": transcript,
             "recording_url": recording_url,
             "raw": data if (transcript is None and recording_url is None) else None,
-        }), 200
-    except requests.Timeout:
+        }
+
+        # Let pollers revalidate cheaply: unchanged conversations answer 304 with no body
+        etag = hashlib.blake2b(orjson.dumps(result), digest_size=16).hexdigest()
+        # flask-compress sends compressed responses with ETag "<etag>:<algorithm>"
+        if request.if_none_match.contains(etag) or any(tag.partition(":")[0] == etag for tag in request.if_none_match):
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag)
+            not_modified.headers["Cache-Control"] = "private, max-age=2"
+            return not_modified
+
+        response = jsonify(result)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, max-age=2"
+        return response, 200
+    except httpx.TimeoutException:
         return jsonify({"error": "timeout", "message": "Request to ElevenLabs timed out."}), 504
     except Exception as e:
         logger.exception("Unexpected error while fetching conversation")
@@ -556,8 +993,16 @@ def get_conversation(conversation_id: str):
 
 @app.route("/api/calls", methods=["GET"])
 def list_calls():
-    index = _read_index()
-    return jsonify(index)
+    try:
+        limit = min(max(int(request.args.get("limit", LIST_CALLS_DEFAULT_LIMIT)), 1), LIST_CALLS_MAX_LIMIT)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({
+            "error": "invalid_pagination",
+            "message": "'limit' and 'offset' must be integers."
+        }), 400
+    calls, total = _list_calls(limit, offset)
+    return jsonify({"calls": calls, "total": total, "limit": limit, "offset": offset})
 
 
 @app.route("/api/calls/<call_id>", methods=["GET"])
@@ -570,49 +1015,56 @@ def get_call(call_id: str):
 
 @app.route("/api/calls/stream", methods=["GET"])
 def calls_stream():
-    q: queue.Queue = queue.Queue(maxsize=100)
-    _sse_clients.append(q)
+    subscriber = {"q": queue.Queue(maxsize=_SSE_QUEUE_SIZE), "misses": 0}
+    with _sse_lock:
+        # Replay and subscribe atomically so no broadcast is missed or duplicated
+        backlog = _sse_replay_since(request.headers.get("Last-Event-ID"))
+        _sse_clients.append(subscriber)
+
+    def unsubscribe():
+        with _sse_lock:
+            try:
+                _sse_clients.remove(subscriber)
+            except ValueError:
+                pass
 
-    def gen():
-        try:
-            # Send an initial comment to open the stream
-            yield ": connected\n\n"
-            while True:
-                try:
-                    msg = q.get(timeout=25)
-                    yield f"data: {msg}\n\n"
-                except queue.Empty:
-                    # keep-alive
-                    yield ": keepalive\n\n"
-        finally:
+    return _sse_stream(subscriber["q"], unsubscribe, backlog)
+
+
+@app.route("/api/conversations/<conversation_id>/stream", methods=["GET"])
+def conversation_stream(conversation_id: str):
+    """Push transcript/recording updates for one conversation as they arrive via webhook."""
+    q: queue.Queue = queue.Queue(maxsize=_SSE_QUEUE_SIZE)
+    with _convo_subscribers_lock:
+        # Read the latest frame and subscribe atomically; it is sent ahead of anything queued later
+        _convo_subscribers.setdefault(conversation_id, []).append(q)
+        last = _convo_last_event.get(conversation_id)
+
+    def unsubscribe():
+        with _convo_subscribers_lock:
+            subscribers = _convo_subscribers.get(conversation_id, [])
             try:
-                _sse_clients.remove(q)
+                subscribers.remove(q)
             except ValueError:
                 pass
+            if not subscribers:
+                _convo_subscribers.pop(conversation_id, None)
 
-    return Response(gen(), mimetype="text/event-stream")
+    return _sse_stream(q, unsubscribe, [last] if last is not None else None)
 
 
 # Initialize OpenAI client via environment variable OPENAI_API_KEY
 # Ensure OPENAI_API_KEY is set in your environment or .env file
 client = OpenAI()
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    try:
-        data = request.json
-        user_message = data.get('message')
-        conversation_history = data.get('history', [])
-        call_details = data.get('callDetails', {})
-
-        # Build the system prompt with call context
-        system_prompt = f"""You are Vera — an intelligent, friendly personal calling assistant. 
+# System prompt templates, built once; only the call context varies per request
+CHAT_SYSTEM_PROMPT_TMPL = """You are Vera — an intelligent, friendly personal calling assistant. 
 Your goal is to help yourself (Vera) prepare for an upcoming phone call by asking short, insightful questions and guiding them to gather all necessary information.
 
 📞 Call Context:
-- Calling: {call_details.get('receiver', 'Unknown')}
-- Phone: {call_details.get('phone', 'Unknown')}
-- Purpose: {call_details.get('callDetails', 'Not specified')}
+- Calling: {receiver}
+- Phone: {phone}
+- Purpose: {purpose}
 
 🎯 Your Tasks:
 1. Ask clear, targeted questions to collect all information that you might need for the call.
@@ -627,16 +1079,52 @@ Your goal is to help yourself (Vera) prepare for an upcoming phone call by askin
 Remember: your job is to make the user feel **confident and ready** for you making the call for them (Vera will be making the call).
 """
 
-        # Build messages array for GPT
-        messages = [{"role": "system", "content": system_prompt}]
+INITIAL_MESSAGE_PROMPT_TMPL = """You are Vera, an intelligent personal calling assistant. Generate a brief, friendly greeting message to introduce yourself for this call preparation session.
 
-        # Add conversation history
-        for msg in conversation_history:
-            role = "user" if msg['type'] == 'user' else "assistant"
-            messages.append({"role": role, "content": msg['content']})
+Call Context:
+- Calling: {receiver}
+- Phone: {phone}
+- Purpose: {purpose}
 
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
+Create a warm greeting (2-3 sentences) that:
+1. Introduces yourself as Vera
+2. Acknowledges the call context
+3. Offers to help prepare for the call
+
+Be conversational and encouraging."""
+
+def _format_call_prompt(template: str, call_details: Dict[str, Any]) -> str:
+    return template.format(
+        receiver=call_details.get('receiver', 'Unknown'),
+        phone=call_details.get('phone', 'Unknown'),
+        purpose=call_details.get('callDetails', 'Not specified'),
+    )
+
+def _chat_messages(user_message: str, conversation_history: list, call_details: Dict[str, Any]) -> list[Dict[str, str]]:
+    # Build the system prompt with call context
+    system_prompt = _format_call_prompt(CHAT_SYSTEM_PROMPT_TMPL, call_details)
+
+    # Build messages array for GPT
+    messages = [{"role": "system", "content": system_prompt}]
+
+    # Add conversation history
+    for msg in conversation_history:
+        role = "user" if msg['type'] == 'user' else "assistant"
+        messages.append({"role": role, "content": msg['content']})
+
+    # Add current user message
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    try:
+        data = request.json
+        user_message = data.get('message')
+        conversation_history = data.get('history', [])
+        call_details = data.get('callDetails', {})
+
+        messages = _chat_messages(user_message, conversation_history, call_details)
 
         # Call OpenAI API
         response = client.chat.completions.create(
@@ -654,12 +1142,47 @@ Remember: your job is to make the user feel **confident and ready** for you maki
         })
 
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Error in /api/chat")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Same as /api/chat, but streams the reply as SSE `{"delta": ...}` events ending with `{"done": true}`."""
+    try:
+        data = request.json
+        messages = _chat_messages(data.get('message'), data.get('history', []), data.get('callDetails', {}))
+    except Exception as e:
+        logger.exception("Error in /api/chat/stream")
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+    def gen():
+        try:
+            stream = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True,
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield f"data: {orjson.dumps({'delta': delta}).decode()}\n\n"
+            yield f"data: {orjson.dumps({'done': True}).decode()}\n\n"
+        except Exception as e:
+            logger.exception("Error in /api/chat/stream")
+            yield f"data: {orjson.dumps({'error': str(e)}).decode()}\n\n"
+
+    return Response(gen(), mimetype="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
 @app.route('/api/initial-message', methods=['POST'])
 def initial_message():
     """Generate the initial greeting message when an assistant is created"""
@@ -667,19 +1190,7 @@ def initial_message():
         data = request.json
         call_details = data.get('callDetails', {})
 
-        system_prompt = f"""You are Vera, an intelligent personal calling assistant. Generate a brief, friendly greeting message to introduce yourself for this call preparation session.
-
-Call Context:
-- Calling: {call_details.get('receiver', 'Unknown')}
-- Phone: {call_details.get('phone', 'Unknown')}
-- Purpose: {call_details.get('callDetails', 'Not specified')}
-
-Create a warm greeting (2-3 sentences) that:
-1. Introduces yourself as Vera
-2. Acknowledges the call context
-3. Offers to help prepare for the call
-
-Be conversational and encouraging."""
+        system_prompt = _format_call_prompt(INITIAL_MESSAGE_PROMPT_TMPL, call_details)
 
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -696,12 +1207,23 @@ Be conversational and encouraging."""
         })
 
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Error in /api/initial-message")
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+# Assistant names become file names: keep (Unicode) word characters, space and '-'; spaces become '_'
+_FILENAME_UNSAFE = re.compile(r"[^\w -]+")
+_FILENAME_SPACES = re.compile(r"\s+")
+
+def _safe_filename(value) -> str:
+    """Reduce *value* to a file-name stem; empty if nothing usable is left."""
+    if value is None:
+        return ""
+    return _FILENAME_SPACES.sub("_", _FILENAME_UNSAFE.sub("", str(value))).strip("_")
+
+
 @app.route('/api/finalize-call', methods=['POST'])
 def finalize_call():
     """Extract structured call information and save to JSON file"""
@@ -739,13 +1261,12 @@ def finalize_call():
         os.makedirs('calls', exist_ok=True)
 
         # Create filename from assistant name (sanitize for filesystem)
-        safe_name = "".join(c for c in assistant_name if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_name = safe_name.replace(' ', '_')
+        safe_name = _safe_filename(assistant_name) or _safe_filename(assistant_id) or "Unknown"
         filename = f"calls/{safe_name}.json"
 
-        # Save to JSON file
-        with open(filename, 'w') as f:
-            json.dump(call_data, f, indent=2)
+        # Save to JSON file (serialized once, single write)
+        with open(filename, 'wb') as f:
+            f.write(_dump_json_file(call_data))
 
         return jsonify({
             "success": True,
@@ -755,12 +1276,16 @@ def finalize_call():
         })
 
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Error in /api/finalize-call")
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
 if __name__ == "__main__":
-    # Bind to all interfaces to be reachable via ngrok
-    app.run(host="0.0.0.0", port=PORT)
+    # Production entry point is `gunicorn -c gunicorn_conf.py app:app`; Flask's dev server is opt-in
+    if not os.getenv("DEV_SERVER"):
+        raise SystemExit("Run with `gunicorn -c gunicorn_conf.py app:app` (or set DEV_SERVER=1 for Flask's dev server).")
+    # Bind to all interfaces to be reachable via ngrok; threaded so SSE streams and
+    # in-flight ElevenLabs/OpenAI calls don't serialize (single process keeps in-memory state shared)
+    app.run(host="0.0.0.0", port=CFG.port, threaded=True)
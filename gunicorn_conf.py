@@ -0,0 +1,17 @@
+import os
+
+# Gunicorn settings for serving app:app
+# Run with: gunicorn -c gunicorn_conf.py app:app
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+
+# SSE subscribers, caches and the call store live in-process, so events only reach
+# clients connected to the same worker. Keep a single worker unless those move to
+# a shared backend; gevent gives each request (including long-lived SSE streams) a
+# greenlet, so streams no longer pin OS threads while ElevenLabs/OpenAI calls are in flight.
+# The gevent worker monkey-patches the stdlib before app.py is imported.
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "gevent"
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+keepalive = 75
+timeout = 60
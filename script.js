@@ -149,10 +149,10 @@ function createAgent() {
         return;
     }
 
-    // Validate phone number format (US format: 10 digits or with country code)
-    const phoneRegex = /^[\+]?[(]?[0-9]{1,4}[)]?[-\s\.]?[(]?[0-9]{1,4}[)]?[-\s\.]?[0-9]{1,5}[-\s\.]?[0-9]{1,5}$/;
-    if (!phoneRegex.test(phoneNumber)) {
-        alert('Please enter a valid phone number (e.g., 123-456-7890 or +1-123-456-7890)');
+    // Validate phone number format (E.164 with country code; spaces, dots, dashes and parentheses allowed)
+    const phoneRegex = /^\+[1-9]\d{7,14}$/;
+    if (!phoneRegex.test(phoneNumber.replace(/[\s().-]/g, ''))) {
+        alert('Please enter the phone number with its country code (e.g., +1-555-123-4567)');
         return;
     }
 